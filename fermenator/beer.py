@@ -17,6 +17,67 @@ from .exception import (
     StaleDataError, ConfigurationError, DataFetchError,
     InvalidTemperatureError, DataSourceError)
 
+#: Recommendation returned by beers that need to be heated
+HEATING_STATE = 'heating'
+#: Recommendation returned by beers that need to be cooled
+COOLING_STATE = 'cooling'
+#: Recommendation returned by beers that need neither heating nor cooling
+PASSIVE_STATE = 'passive'
+
+def _pop_required(kwargs, key, cast=None):
+    """
+    Removes `key` from the `kwargs` dictionary and returns its value, passed
+    through `cast` if given. Raises a :class:`ConfigurationError` if the key is
+    missing.
+    """
+    try:
+        value = kwargs.pop(key)
+    except KeyError:
+        raise ConfigurationError(
+            "{} must be specified in beer config".format(key))
+    if cast is None:
+        return value
+    return cast(value)
+
+class WeightedMovingAverage(object):
+    """
+    A linearly weighted moving average of the last `size` values added, where
+    the most recent value gets a weight of `size`, the one before it a weight
+    of `size - 1`, and so on. Running totals are kept so that adding a value
+    doesn't require a pass over the history; the totals are recomputed from
+    it once every `size` values, so that rounding errors don't build up over
+    a long fermentation.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._values = collections.deque(maxlen=size)
+        self._total = 0.0
+        self._numerator = 0.0
+        self._adds = 0
+        self.value = None
+
+    def add(self, value):
+        "Adds `value` to the history and returns the updated average"
+        size = self.size
+        # every value already in the history loses one unit of weight, and the
+        # oldest drops out with its last unit if the history is full
+        self._numerator += size * value - self._total
+        self._total += value
+        if len(self._values) == size:
+            self._total -= self._values[0]
+        self._values.append(value)
+        count = len(self._values)
+        self._adds += 1
+        if self._adds == size:
+            self._adds = 0
+            self._total = sum(self._values)
+            self._numerator = sum(
+                weight * reading for weight, reading in
+                enumerate(self._values, size - count + 1))
+        self.value = self._numerator / (count * size - count * (count - 1) / 2)
+        return self.value
+
 class AbstractBeer(object):
     """
     Represents beer sitting in a fermenter or other temperature-controlled
@@ -45,9 +106,6 @@ class AbstractBeer(object):
         self.gravity_unit = kwargs.pop('gravity_unit', 'P')
         self.temperature_unit = kwargs.pop('temperature_unit', 'C')
 
-    def __del__(self):
-        self.log.debug("destructing")
-
     @property
     def name(self):
         """
@@ -70,6 +128,20 @@ class AbstractBeer(object):
         set point of the system."""
         pass
 
+    def get_recommendation(self, heating_state, cooling_state):
+        """
+        Returns :data:`HEATING_STATE`, :data:`COOLING_STATE` or
+        :data:`PASSIVE_STATE`, depending on what the beer needs right now.
+        This implementation asks :meth:`requires_heating`, then
+        :meth:`requires_cooling`; subclasses that fetch data to answer those
+        questions should override it to answer both from a single fetch.
+        """
+        if self.requires_heating(heating_state, cooling_state):
+            return HEATING_STATE
+        if self.requires_cooling(heating_state, cooling_state):
+            return COOLING_STATE
+        return PASSIVE_STATE
+
     def check_timestamp(self, timestamp):
         """
         Pass a datetime timestamp to this function, it will return True if the date is
@@ -95,6 +167,10 @@ class NoOpBeer(AbstractBeer):
         "Always returns false"
         return False
 
+    def get_recommendation(self, heating_state, cooling_state):
+        "Always returns :data:`PASSIVE_STATE`"
+        return PASSIVE_STATE
+
 class SetPointBeer(AbstractBeer):
     """
     This version of :class:`AbstractBeer` implements a "dumb" set-point
@@ -125,24 +201,14 @@ class SetPointBeer(AbstractBeer):
           in errors [default: -5.0]
         """
         super(SetPointBeer, self).__init__(name, **kwargs)
-        try:
-            self.read_datasource = kwargs.pop('read_datasource')
-        except KeyError:
-            raise ConfigurationError("read_datasource is required in kwargs")
-        try:
-            self.identifier = kwargs.pop('identifier')
-        except KeyError:
-            raise ConfigurationError("no identifier specified in beer config")
-        try:
-            self.set_point = float(kwargs.pop('set_point'))
-        except KeyError:
-            raise ConfigurationError("no set_point in kwargs")
+        self.read_datasource = _pop_required(kwargs, 'read_datasource')
+        self.identifier = _pop_required(kwargs, 'identifier')
+        self.set_point = _pop_required(kwargs, 'set_point', float)
         self.tolerance = float(kwargs.pop('tolerance', 0.5))
         self.moving_average_size = int(kwargs.pop('moving_average_size', 10))
         self.max_temp_value = float(kwargs.pop('max_temp_value', 35.0))
         self.min_temp_value = float(kwargs.pop('min_temp_value', -5.0))
-        self._temp_readings = collections.deque(
-            [None]*self.moving_average_size, self.moving_average_size)
+        self._temp_average = WeightedMovingAverage(self.moving_average_size)
         self._moving_avg_temp = None
 
     def avg_temp(self):
@@ -174,18 +240,7 @@ class SetPointBeer(AbstractBeer):
         """
         Updates the moving average and readings history.
         """
-        self._temp_readings.append(temp)
-        if self._moving_avg_temp is None:
-            self._moving_avg_temp = temp
-        else:
-            denom = 0
-            numerator = 0
-            for reading in range(self.moving_average_size, 0, -1):
-                if self._temp_readings[reading - 1] is None:
-                    break
-                numerator += reading * self._temp_readings[reading -1]
-                denom += reading
-            self._moving_avg_temp = numerator / float(denom)
+        self._moving_avg_temp = self._temp_average.add(temp)
 
     def requires_heating(self, heating_state, cooling_state):
         """
@@ -200,7 +255,41 @@ class SetPointBeer(AbstractBeer):
         """
         if self.set_point is None:
             return False
+        return self._is_too_cold(self._get_temperature(), heating_state)
+
+    def requires_cooling(self, heating_state, cooling_state):
+        """
+        Returns True if the beer is warmer than the set point by more than
+        the configured tolerance, False otherwise.
+
+        heating_state and cooling_state are boolean values representing whether
+        a beer is currently being heated or cooled, which influences the
+        set point of the system.
+        """
+        if self.set_point is None:
+            return False
+        return self._is_too_hot(self._get_temperature(), cooling_state)
+
+    def get_recommendation(self, heating_state, cooling_state):
+        """
+        Same as :meth:`AbstractBeer.get_recommendation`, but fetches the
+        temperature only once.
+        """
+        if self.set_point is None:
+            return PASSIVE_STATE
         temp = self._get_temperature()
+        if self._is_too_cold(temp, heating_state):
+            return HEATING_STATE
+        if self._is_too_hot(temp, cooling_state):
+            return COOLING_STATE
+        return PASSIVE_STATE
+
+    def _is_too_cold(self, temp, heating_state):
+        """
+        Returns True if the moving average temperature is below the set point,
+        less the tolerance if the beer isn't already being heated. `temp` is
+        the latest reading, used for logging.
+        """
         set_point = self.set_point - self.tolerance
         if heating_state:
             set_point = self.set_point
@@ -211,19 +300,14 @@ class SetPointBeer(AbstractBeer):
                 temp, self._moving_avg_temp, self.set_point, set_point,
                 self.tolerance)
             return True
+        return False
 
-    def requires_cooling(self, heating_state, cooling_state):
+    def _is_too_hot(self, temp, cooling_state):
         """
-        Returns True if the beer is warmer than the set point by more than
-        the configured tolerance, False otherwise.
-
-        heating_state and cooling_state are boolean values representing whether
-        a beer is currently being heated or cooled, which influences the
-        set point of the system.
+        Returns True if the moving average temperature is above the set point,
+        plus the tolerance if the beer isn't already being cooled. `temp` is
+        the latest reading, used for logging.
         """
-        if self.set_point is None:
-            return False
-        temp = self._get_temperature()
         set_point = self.set_point + self.tolerance
         if cooling_state:
             set_point = self.set_point
@@ -278,39 +362,19 @@ class LinearBeer(AbstractBeer):
           average [default: 10]
         """
         super(LinearBeer, self).__init__(name, **kwargs)
-        try:
-            self.read_datasource = kwargs.pop('read_datasource')
-        except KeyError:
-            raise ConfigurationError("read_datasource is required in kwargs")
-        try:
-            self.identifier = kwargs.pop('identifier')
-        except KeyError:
-            raise ConfigurationError("no identifier specified in beer config")
-        try:
-            self.original_gravity = float(kwargs.pop('original_gravity'))
-        except KeyError:
-            raise ConfigurationError("original_gravity must be specified")
-        try:
-            self.final_gravity = float(kwargs.pop('final_gravity'))
-        except KeyError:
-            raise ConfigurationError("final_gravity must be specified")
-        try:
-            self.start_set_point = float(kwargs.pop('start_set_point'))
-        except KeyError:
-            raise ConfigurationError("start_set_point must be specified")
-        try:
-            self.end_set_point = float(kwargs.pop('end_set_point'))
-        except KeyError:
-            raise ConfigurationError("end_set_point must be specified")
+        self.read_datasource = _pop_required(kwargs, 'read_datasource')
+        self.identifier = _pop_required(kwargs, 'identifier')
+        self.original_gravity = _pop_required(kwargs, 'original_gravity', float)
+        self.final_gravity = _pop_required(kwargs, 'final_gravity', float)
+        self.start_set_point = _pop_required(kwargs, 'start_set_point', float)
+        self.end_set_point = _pop_required(kwargs, 'end_set_point', float)
         self.tolerance = float(kwargs.pop('tolerance', 0.5))
         self.max_temp_value = float(kwargs.pop('max_temp_value', 35.0))
         self.min_temp_value = float(kwargs.pop('min_temp_value', -5.0))
         self.moving_average_size = int(kwargs.pop('moving_average_size', 10))
-        self._temp_readings = collections.deque(
-            [None]*self.moving_average_size, self.moving_average_size)
+        self._temp_average = WeightedMovingAverage(self.moving_average_size)
         self._moving_avg_temp = None
-        self._grav_readings = collections.deque(
-            [None]*self.moving_average_size, self.moving_average_size)
+        self._grav_average = WeightedMovingAverage(self.moving_average_size)
         self._moving_avg_grav = None
 
     def avg_temp(self):
@@ -346,18 +410,7 @@ class LinearBeer(AbstractBeer):
         """
         Updates the moving average and readings history.
         """
-        self._temp_readings.append(temp)
-        if self._moving_avg_temp is None:
-            self._moving_avg_temp = temp
-        else:
-            denom = 0
-            numerator = 0
-            for reading in range(self.moving_average_size, 0, -1):
-                if self._temp_readings[reading - 1] is None:
-                    break
-                numerator += reading * self._temp_readings[reading -1]
-                denom += reading
-            self._moving_avg_temp = numerator / float(denom)
+        self._moving_avg_temp = self._temp_average.add(temp)
 
     def _get_gravity(self, retries=3):
         """
@@ -380,24 +433,47 @@ class LinearBeer(AbstractBeer):
         """
         Updates the moving average and readings history.
         """
-        self._grav_readings.append(grav)
-        if self._moving_avg_grav is None:
-            self._moving_avg_grav = grav
-        else:
-            denom = 0
-            numerator = 0
-            for reading in range(self.moving_average_size, 0, -1):
-                if self._grav_readings[reading - 1] is None:
-                    break
-                numerator += reading * self._grav_readings[reading -1]
-                denom += reading
-            self._moving_avg_grav = numerator / float(denom)
+        self._moving_avg_grav = self._grav_average.add(grav)
 
     def requires_heating(self, heating_state, cooling_state):
+        "Returns True if the beer is colder than the current target allows"
+        return self._is_too_cold(self._get_readings(), heating_state)
+
+    def requires_cooling(self, heating_state, cooling_state):
+        "Returns True if the beer is warmer than the current target allows"
+        return self._is_too_hot(self._get_readings(), cooling_state)
+
+    def get_recommendation(self, heating_state, cooling_state):
+        """
+        Same as :meth:`AbstractBeer.get_recommendation`, but fetches gravity
+        and temperature only once.
+        """
+        readings = self._get_readings()
+        if self._is_too_cold(readings, heating_state):
+            return HEATING_STATE
+        if self._is_too_hot(readings, cooling_state):
+            return COOLING_STATE
+        return PASSIVE_STATE
+
+    def _get_readings(self):
+        """
+        Fetches the current gravity and temperature, and returns them along
+        with the resulting fermentation progress and target temperature as
+        a tuple of (gravity, temperature, progress, target).
+        """
         gravity = self._get_gravity()
         current_temp = self._get_temperature()
         progress = self.calc_progress(self._moving_avg_grav)
         target = self.current_target_temperature(progress)
+        return gravity, current_temp, progress, target
+
+    def _is_too_cold(self, readings, heating_state):
+        """
+        Returns True if the moving average temperature is below the target,
+        less the tolerance if the beer isn't already being heated. Pass the
+        tuple returned by :meth:`_get_readings`.
+        """
+        gravity, current_temp, progress, target = readings
         set_point = target - self.tolerance
         if heating_state:
             set_point = target
@@ -411,11 +487,13 @@ class LinearBeer(AbstractBeer):
             return True
         return False
 
-    def requires_cooling(self, heating_state, cooling_state):
-        gravity = self._get_gravity()
-        current_temp = self._get_temperature()
-        progress = self.calc_progress(self._moving_avg_grav)
-        target = self.current_target_temperature(progress)
+    def _is_too_hot(self, readings, cooling_state):
+        """
+        Returns True if the moving average temperature is above the target,
+        plus the tolerance if the beer isn't already being cooled. Pass the
+        tuple returned by :meth:`_get_readings`.
+        """
+        gravity, current_temp, progress, target = readings
         set_point = target + self.tolerance
         if cooling_state:
             set_point = target
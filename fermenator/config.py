@@ -162,6 +162,8 @@ class FermenatorConfig():
         self._managers = dict()
         self._beers = dict()
         self._datasources = dict()
+        for relay in self._relays.values():
+            relay.close()
         self._relays = dict()
         garbage_collect()
 
@@ -2,18 +2,19 @@
 This library contains functions for performing basic conversions
 """
 import datetime
+import math
 
 def temp_f_to_c(temp_f):
     "Convert a Fahrenheit temperature to celcius, floating point"
-    return (temp_f - 32) * 5.0 / 9.0
+    return (temp_f - 32) * (5.0 / 9.0)
 
 def temp_c_to_f(temp_c):
     "Convert a Celcius temperature to Fahrenheit, floating point"
-    return temp_c * 9.0 / 5.0 + 32
+    return temp_c * (9.0 / 5.0) + 32
 
 def sg_to_plato(sg):
     "Convert a standard gravity reading to plato (floating point)"
-    return 135.997 * sg**3 - 630.272 * sg**2 + 1111.14 * sg - 616.868
+    return ((135.997 * sg - 630.272) * sg + 1111.14) * sg - 616.868
 
 def rfc3339_timestamp_to_datetime(ts_string):
     """
@@ -43,9 +44,10 @@ def convert_spreadsheet_date(sheetdate):
     """
     try:
         sheetdate = float(sheetdate)
+        days = math.floor(sheetdate)
         return SPREADSHEET_DATETIME_BASE + datetime.timedelta(
-            days=int('{:.0f}'.format(sheetdate)),
-            seconds=int((sheetdate % 1.0) * 86400)
+            days=days,
+            seconds=int((sheetdate - days) * 86400)
         )
     except ValueError:
         # new date format: M/D/Y HH:MM:SS
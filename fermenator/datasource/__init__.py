@@ -8,6 +8,10 @@ class DataSource(object):
     subclass: :meth:`get` and :meth:`set`.
     """
 
+    #: True for datastores that record every value written as a point in a
+    #: time series, rather than keeping only the latest value for each key
+    TIME_SERIES = False
+
     def __init__(self, name, **kwargs):
         """
         This method will be used in class implementations to configure the datasource
@@ -46,6 +50,15 @@ class DataSource(object):
         """
         pass
 
+    def set_many(self, items):
+        """
+        Set several values at once, given an iterable of `(key, value)` pairs.
+        Calls :meth:`set` for each pair; subclasses that can write several keys
+        in one request should override this.
+        """
+        for key, value in items:
+            self.set(key, value)
+
     def __str__(self):
         "Returns a string representation of this object"
         return "{}(\"{}\")".format(self.__class__.__name__, self.name)
@@ -38,6 +38,8 @@ class CarbonDataSource(DataSource):
     """
     __lock = threading.RLock()
 
+    TIME_SERIES = True
+
     def __init__(self, name, **kwargs):
         """
         Requires these additional kwargs:
@@ -52,18 +54,9 @@ class CarbonDataSource(DataSource):
             self.host = kwargs['host']
         except KeyError:
             raise ConfigurationError("host must be provided")
-        try:
-            self.port = kwargs['port']
-        except KeyError:
-            self.port = 2003
-        try:
-            self.timeout = kwargs['socket_timeout']
-        except KeyError:
-            self.timeout = 5.0
-        try:
-            self.enable_keepalive = kwargs['enable_keepalive']
-        except KeyError:
-            self.enable_keepalive = True
+        self.port = kwargs.get('port', 2003)
+        self.timeout = kwargs.get('socket_timeout', 5.0)
+        self.enable_keepalive = kwargs.get('enable_keepalive', True)
         self.__socket = None
 
     @property
@@ -104,14 +97,37 @@ class CarbonDataSource(DataSource):
         key = '.'.join(key)
         self._send(key, value, timestamp)
 
+    def set_many(self, items, timestamp=None):
+        """
+        Same as :meth:`set` for several `(key, value)` pairs, all with the same
+        timestamp, sent to carbon in a single write.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        lines = []
+        for key, value in items:
+            if not isinstance(value, numbers.Number):
+                raise DataValidationError(
+                    "bad data for logging to carbon: %s", value)
+            lines.append("{} {} {}\n".format(
+                '.'.join(key), value, int(timestamp)))
+        if lines:
+            self._send_payload(''.join(lines).encode())
+
     def _send(self, key, value, timestamp):
         """
         Implement the low-level socket send operation
         """
-        payload = "{} {} {}\n".format(key, value, int(timestamp)).encode()
+        self._send_payload(
+            "{} {} {}\n".format(key, value, int(timestamp)).encode())
+
+    def _send_payload(self, payload):
+        """
+        Sends already-formatted plaintext protocol lines to carbon
+        """
         try:
             with CarbonDataSource.__lock:
-                self.socket.send(payload)
+                self.socket.sendall(payload)
         except OSError as err:
             self.log.error("Error while writing to carbon: %s", err.__str__())
             if err.errno == 32:
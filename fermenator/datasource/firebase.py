@@ -91,6 +91,21 @@ class FirebaseDataSource(DataSource):
                 self._fb_hndl = None
                 raise DataWriteError("write to firebase failed: {}".format(err))
 
+    def set_many(self, items):
+        """
+        Same as :meth:`set` for several `(key, value)` pairs, but written with
+        a single multi-path update rather than a request per key.
+        """
+        data = dict(('/'.join(key), value) for key, value in items)
+        with FirebaseDataSource.__lock:
+            try:
+                self._handle.update(data)
+            except (requests.exceptions.HTTPError, ssl.SSLError,
+                    ssl.SSLEOFError, urllib3.exceptions.SSLError,
+                    urllib3.exceptions.MaxRetryError) as err:
+                self._fb_hndl = None
+                raise DataWriteError("write to firebase failed: {}".format(err))
+
 class BrewConsoleFirebaseDS(FirebaseDataSource):
     """
     Implements a version of the :class:`FirebaseDataSource` class that provides
@@ -108,20 +123,10 @@ class BrewConsoleFirebaseDS(FirebaseDataSource):
         - temperature_key_name: optional [default: 1w_temperature]
         """
         super(BrewConsoleFirebaseDS, self).__init__(name, **kwargs)
-        try:
-            self.gravity_unit = kwargs['gravity_unit'].upper()
-            del kwargs['gravity_unit']
-        except KeyError:
-            self.gravity_unit = 'P'
-        try:
-            self.temperature_unit = kwargs['temperature_unit'].upper()
-            del kwargs['temperature_unit']
-        except KeyError:
-            self.temperature_unit = 'C'
-        try:
-            self.temperature_key_name = kwargs['temperature_key_name']
-        except KeyError:
-            self.temperature_key_name = '1w_temperature'
+        self.gravity_unit = kwargs.get('gravity_unit', 'P').upper()
+        self.temperature_unit = kwargs.get('temperature_unit', 'C').upper()
+        self.temperature_key_name = kwargs.get(
+            'temperature_key_name', '1w_temperature')
 
     def get_gravity(self, identifier):
         """
@@ -3,8 +3,12 @@ This class includes the objects that expose google sheet data as either
 configuration or beer information.
 """
 import logging
-from collections import deque
+from collections import deque, OrderedDict
 import re
+import os
+import os.path
+import threading
+import time
 from oauth2client.service_account import ServiceAccountCredentials
 import requests
 from apiclient import discovery
@@ -18,6 +22,15 @@ DEFAULT_CREDENTIAL_LOCATIONS = (
     '~/.fermenator/credentials.json',
     '/etc/fermenator/credentials.json')
 
+#: Where downloaded API discovery documents are cached
+DISCOVERY_CACHE_DIR = '~/.fermenator'
+
+#: Cached discovery documents older than this (seconds) are downloaded again
+DISCOVERY_CACHE_MAX_AGE = 7 * 24 * 3600
+
+SHEETS_DISCOVERY_URL = 'https://sheets.googleapis.com/$discovery/rest?version=v4'
+DRIVE_DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/drive/v3/rest'
+
 class GoogleSheet(fermenator.datasource.DataSource):
     """
     A base class designed to allow a user to get data from a google sheets
@@ -30,10 +43,46 @@ class GoogleSheet(fermenator.datasource.DataSource):
     code is based on the concepts found here:
 
     https://developers.google.com/sheets/api/quickstart/python
+
+    Sheet range data and drive change tracking are kept at the class level,
+    so that several objects reading the same spreadsheet share a single copy
+    of the data and a single set of API fetches. API calls for a spreadsheet
+    are serialized by a lock of its own, so that different spreadsheets don't
+    wait on each other.
     """
+    # guards the class-level dictionaries below, never held during API calls
+    __lock = threading.RLock()
+
+    #: Sheet data shared by all instances, keyed by (spreadsheet_id, range,
+    #: value render option), with values of (fetch time, data), least
+    #: recently used first
+    _ss_cache = OrderedDict()
+
+    #: Drive change tokens, keyed by spreadsheet id
+    _ss_change_tokens = dict()
+
+    #: When the drive API was last checked for changes, keyed by spreadsheet id
+    _ss_last_change_poll = dict()
+
+    #: Locks serializing API calls, keyed by spreadsheet id
+    _ss_locks = dict()
+
+    #: Maximum number of sheet ranges held in the cache
+    MAX_CACHED_RANGES = 64
+
+    #: Seconds after which cached range data is fetched again, even if no
+    #: change to the spreadsheet has been detected
+    CACHE_TTL = 3600
+
+    #: How the sheets API should render cell values for this class
+    VALUE_RENDER_OPTION = 'FORMATTED_VALUE'
+
     def __init__(self, name, **kwargs):
         """
-        This object requires one kwarg, spreadsheet_id.
+        This object requires one kwarg, spreadsheet_id. Optionally, provide:
+
+        - change_poll_interval: minimum number of seconds between checks of
+          the drive API for spreadsheet changes [default: 30]
         """
         super(GoogleSheet, self).__init__(name, **kwargs)
         self.name = name
@@ -44,10 +93,13 @@ class GoogleSheet(fermenator.datasource.DataSource):
         #self.log.debug("config: {}".format(self._config))
         self._google_credentials = None
         self._ss_service_handle = None
-        self._ss_cache = dict()
-        self._ss_cache_tokens = dict()
+        self._ss_cache_seen = dict()
+        with GoogleSheet.__lock:
+            self._ss_lock = self._ss_locks.setdefault(
+                self._ss_id, threading.RLock())
         self._drive_service_handle = None
         self._has_refreshed = False
+        self._change_poll_interval = float(kwargs.get('change_poll_interval', 30))
         self._scopes = (
             'https://www.googleapis.com/auth/spreadsheets.readonly',
             'https://www.googleapis.com/auth/drive.readonly')
@@ -73,21 +125,50 @@ class GoogleSheet(fermenator.datasource.DataSource):
         Retreive a range for the given spreadsheet ID. Range data will be cached locally
         to avoid re-getting the same data over and over again through the API. Any
         changes to a spreadsheet will cause the cache to be invalidated and new sheet
-        data to be retrieved.
+        data to be retrieved for every cached range of that spreadsheet, whichever
+        object notices the change. At most :attr:`MAX_CACHED_RANGES` ranges are kept,
+        least recently used first out, and data older than :attr:`CACHE_TTL`
+        seconds is always fetched again.
 
         `range` should follow the same convention as a linked cell, for example::
 
             Sheet1!A1:E
 
-        """
-        cache_key = "%s" % (range,)
-        if not cache_key in self._ss_cache or self.is_spreadsheet_changed():
-            self.log.debug("getting new sheet data for range %s", range)
-            self._ss_cache[cache_key] = self._ss_service.spreadsheets().values().get(
-                spreadsheetId=self._ss_id,
-                range=range).execute()
+        Only the `values` field of the response is requested from the API.
+        """
+        cache_key = (self._ss_id, range, self.VALUE_RENDER_OPTION)
+        with self._ss_lock:
+            # evicts this spreadsheet's cached ranges if it has changed
+            self.is_spreadsheet_changed()
+            now = time.monotonic()
+            with GoogleSheet.__lock:
+                entry = self._ss_cache.get(cache_key)
+            if entry is None or now - entry[0] > self.CACHE_TTL:
+                self.log.debug("getting new sheet data for range %s", range)
+                entry = (now, self._ss_service.spreadsheets().values().get(
+                    spreadsheetId=self._ss_id,
+                    range=range,
+                    fields='values',
+                    valueRenderOption=self.VALUE_RENDER_OPTION,
+                    dateTimeRenderOption='SERIAL_NUMBER').execute())
+            with GoogleSheet.__lock:
+                self._ss_cache[cache_key] = entry
+                self._ss_cache.move_to_end(cache_key)
+                while len(self._ss_cache) > self.MAX_CACHED_RANGES:
+                    self._ss_cache.popitem(last=False)
+            data = entry[1]
+        # data may have been fetched by another instance sharing the cache
+        if self._ss_cache_seen.get(cache_key) is not data:
+            self._ss_cache_seen[cache_key] = data
             self._has_refreshed = True
-        return self._ss_cache[cache_key]
+        return data
+
+    def _evict_spreadsheet(self):
+        "Drops every cached range of this spreadsheet"
+        with GoogleSheet.__lock:
+            for cache_key in [
+                    key for key in self._ss_cache if key[0] == self._ss_id]:
+                del self._ss_cache[cache_key]
 
     def is_refreshed(self):
         """
@@ -158,10 +239,9 @@ class GoogleSheet(fermenator.datasource.DataSource):
         google sheets API.
         """
         self.log.debug("getting new spreadsheet service handle")
-        self._ss_service_handle = discovery.build(
-            'sheets', 'v4', http=self._credentials.authorize(CustomHttp()),
-            discoveryServiceUrl='https://sheets.googleapis.com/$discovery/rest?version=v4',
-            cache_discovery=False)
+        self._ss_service_handle = discovery.build_from_document(
+            self._discovery_document('sheets_v4.json', SHEETS_DISCOVERY_URL),
+            http=self._credentials.authorize(CustomHttp()))
 
     def _get_drive_service(self):
         """
@@ -171,22 +251,87 @@ class GoogleSheet(fermenator.datasource.DataSource):
         of the time cached data is used.
         """
         self.log.debug("getting new drive service handle")
-        self._drive_service_handle = discovery.build(
-            'drive', 'v3', http=self._credentials.authorize(CustomHttp()),
-            cache_discovery=False)
+        self._drive_service_handle = discovery.build_from_document(
+            self._discovery_document('drive_v3.json', DRIVE_DISCOVERY_URL),
+            http=self._credentials.authorize(CustomHttp()))
+
+    def _discovery_document(self, filename, url):
+        """
+        Returns the API discovery document found at `url`, caching it in
+        :attr:`DISCOVERY_CACHE_DIR` under `filename` so that service handles
+        can be built without a network round trip. Cached documents are
+        downloaded again once they are older than
+        :attr:`DISCOVERY_CACHE_MAX_AGE`; if that download fails, the old copy
+        is used.
+        """
+        path = os.path.join(os.path.expanduser(DISCOVERY_CACHE_DIR), filename)
+        cached = None
+        try:
+            with open(path) as doc_file:
+                cached = doc_file.read()
+            if time.time() - os.path.getmtime(path) < DISCOVERY_CACHE_MAX_AGE:
+                return cached
+        except OSError:
+            pass
+        self.log.debug("downloading discovery document from %s", url)
+        try:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as err:
+            if cached is None:
+                raise DataFetchError(
+                    "unable to download discovery document: {}".format(err))
+            self.log.warning(
+                "using stale discovery document %s: %s", path, err)
+            return cached
+        # objects for different spreadsheets may download the same document at
+        # once, so write a private copy and move it into place
+        tmp_path = "{}.{}.{}.tmp".format(
+            path, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w') as doc_file:
+                doc_file.write(response.text)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            self.log.warning("unable to cache discovery document: %s", err)
+        return response.text
 
     def is_spreadsheet_changed(self):
         """
         Checks the drive API for changes to the specified spreadsheet (file), caches
         state so that subsequent calls to this method only return new changes since the
         last call. Supports tracking changes across multiple spreadsheets.
+
+        Change tracking is shared by all objects reading the same spreadsheet,
+        so a change is only reported to the first of them to check for it.
+        Every cached range of the spreadsheet is evicted at the same time, so
+        that all of them fetch fresh data on their next read.
+        The drive API is consulted at most once per `change_poll_interval`;
+        calls in between return False, and any change made in the meantime is
+        reported by the next call that does reach the API.
+        """
+        with self._ss_lock:
+            now = time.monotonic()
+            last_poll = self._ss_last_change_poll.get(self._ss_id)
+            if last_poll is not None and \
+                now - last_poll < self._change_poll_interval:
+                return False
+            self._ss_last_change_poll[self._ss_id] = now
+            return self._list_changes()
+
+    def _list_changes(self):
+        """
+        Reads the drive changes feed from the stored token onwards, returning
+        True if any of the changes were to this spreadsheet, in which case its
+        cached ranges are evicted. Call this with the spreadsheet lock held.
         """
         have_change = False
         page_token = None
-        if not self._ss_id in self._ss_cache_tokens:
+        if not self._ss_id in self._ss_change_tokens:
             self.log.debug("initializing spreadsheet pageToken cache")
-            self._ss_cache_tokens[self._ss_id] = self._drive_service.changes().getStartPageToken().execute()['startPageToken']
-        page_token = self._ss_cache_tokens[self._ss_id]
+            self._ss_change_tokens[self._ss_id] = self._drive_service.changes().getStartPageToken().execute()['startPageToken']
+        page_token = self._ss_change_tokens[self._ss_id]
         while page_token is not None:
             response = self._drive_service.changes().list(pageToken=page_token,
                                                           spaces='drive').execute()
@@ -199,8 +344,10 @@ class GoogleSheet(fermenator.datasource.DataSource):
                     self.log.debug("ignoring change found in unmatched file %s", change.get('fileId'))
             if 'newStartPageToken' in response:
                 # Last page, save this token for the next polling interval
-                self._ss_cache_tokens[self._ss_id] = response.get('newStartPageToken')
+                self._ss_change_tokens[self._ss_id] = response.get('newStartPageToken')
             page_token = response.get('nextPageToken')
+        if have_change:
+            self._evict_spreadsheet()
         return have_change
 
 
@@ -209,8 +356,13 @@ class BrewometerGoogleSheet(GoogleSheet):
     This class is designed to read data out of a spreadsheet created by the
     brewometer (Tilt) manufacturer, where the data is appended to a worksheet
     called ``Sheet1``.
+
+    Sheet values are read unformatted, so readings arrive as numbers and
+    timestamps as spreadsheet serial dates rather than strings.
     """
 
+    VALUE_RENDER_OPTION = 'UNFORMATTED_VALUE'
+
     def __init__(self, name, **kwargs):
         """
         Pass a spreadsheet_id as a key in the config dictionary.
@@ -249,21 +401,26 @@ class BrewometerGoogleSheet(GoogleSheet):
         raw_data = self.get_sheet_range_values(range='Sheet1!A2:E')
         if self.is_refreshed():
             self.log.debug("data refreshed, building data structure")
+            # unit conversions don't change while building, so pick them once
+            temp_conv = float
+            if self.temperature_unit == 'C':
+                temp_conv = lambda value: temp_f_to_c(float(value))
+            grav_conv = float
+            if self.gravity_unit.upper() == 'P':
+                grav_conv = lambda value: sg_to_plato(float(value))
+            match_batch_id = re.compile(self.batch_id_regex).match
+            rows_by_batch = dict()
             for row in raw_data:
                 try:
                     try:
-                        beername = row[4].upper().strip()
+                        beername = str(row[4]).upper().strip()
                     except IndexError:
                         continue
-                    batch_id_match = re.match(self.batch_id_regex, beername)
+                    batch_id_match = match_batch_id(beername)
                     if batch_id_match:
                         beername = batch_id_match.group(0)
-                    temp = float(row[2])
-                    if self.temperature_unit == 'C':
-                        temp = temp_f_to_c(temp)
-                    gravity = float(row[1])
-                    if self.gravity_unit.upper() == 'P':
-                        gravity = sg_to_plato(gravity)
+                    temp = temp_conv(row[2])
+                    gravity = grav_conv(row[1])
                     structured = {
                         'batch_id': beername,
                         'timestamp': convert_spreadsheet_date(row[0]),
@@ -271,13 +428,13 @@ class BrewometerGoogleSheet(GoogleSheet):
                         'temperature': temp,
                         'tilt_color': row[3]
                     }
-                    if beername in self._data:
-                        self._data[beername].appendleft(structured)
-                    else:
-                        self._data[beername] = deque(
-                            [structured])
+                    rows_by_batch.setdefault(beername, []).append(structured)
                 except IndexError:
                     self.log.error("error in row: %s", row)
+            # newest rows first, matching the order get() yields them in
+            self._data = {
+                beername: deque(reversed(rows))
+                for beername, rows in rows_by_batch.items()}
         return self._data
 
     def get(self, key):
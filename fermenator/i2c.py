@@ -2,6 +2,7 @@
 Represents objects that we interact with over the i2c bus, including wrapping
 objects for thread safety, etc.
 """
+import functools
 import logging
 import threading
 import time
@@ -12,19 +13,29 @@ class MCP23017():
     """
     This represents an MCP23017 I2C-based GPIO expansion IC, used to add more
     GPIO ports to a Raspberry Pi, etc. It wraps the Adafruit version of this
-    object type, making it into a singleton and ensuring that all operations
-    against the chip are mutually exclusive (avoiding colissions).
+    object type, sharing a single device per i2c address and ensuring that all
+    operations on the bus are mutually exclusive (avoiding colissions).
     """
     __lock = threading.RLock()
-    __instance = None
+    __instances = dict()
 
-    def __init__(self, *args, **kwargs):
+    #: Methods of the wrapped device exposed on this object, each of which
+    #: is called with the lock held
+    LOCKED_METHODS = (
+        'setup', 'setup_pins', 'input', 'input_pins', 'output_pins', 'pullup',
+        'set_high', 'set_low', 'is_high', 'is_low', 'write_gpio',
+        'write_iodir', 'write_gppu')
+
+    def __init__(self, address=0x20, **kwargs):
         """
         Takes the exact same arguments as :class:`Adafruit_GPIO.MCP230xx.MCP23017`.
+        The device at each address is only set up once; further objects for the
+        same address share it.
         """
         self.logger = logging.getLogger('fermenator.i2c.MCP23017')
         with MCP23017.__lock:
-            if MCP23017.__instance is None:
+            device = MCP23017.__instances.get(address)
+            if device is None:
                 if 'i2c_interface' not in kwargs:
                     try:
                         # The default i2c interface for Adafruit is their
@@ -34,60 +45,79 @@ class MCP23017():
                         kwargs['i2c_interface'] = smbus.SMBus
                     except ImportError:
                         pass
-                MCP23017.__instance = Adafruit_GPIO.MCP230xx.MCP23017(
-                    *args, **kwargs
-                )
-                for port in range(0, MCP23017.__instance.NUM_GPIO):
-                    MCP23017.__instance.setup(port, Adafruit_GPIO.OUT)
-                MCP23017.__instance.GPIO = 0x14
+                device = Adafruit_GPIO.MCP230xx.MCP23017(address, **kwargs)
+                for port in range(0, device.NUM_GPIO):
+                    device.setup(port, Adafruit_GPIO.OUT)
+                device.GPIO = 0x14
+                MCP23017.__instances[address] = device
+        self._device = device
+        for method_name in self.LOCKED_METHODS:
+            try:
+                method = getattr(device, method_name)
+            except AttributeError:
+                continue
+            setattr(self, method_name, functools.partial(self._locked_call, method))
+
+    @staticmethod
+    def _locked_call(method, *args, **kwargs):
+        "Calls method while holding the device lock"
+        with MCP23017.__lock:
+            return method(*args, **kwargs)
 
     def output(self, *args, **kwargs):
         """
         Workaround because sometimes the state on the MCP23017 gets messed up
         and we need to reconfigure the port output directions for everything
-        to work correctly
+        to work correctly. The lock is held throughout, as the port state is
+        composed from a copy shared by every relay on the chip.
+        """
+        with MCP23017.__lock:
+            self._write_output(*args, **kwargs)
+            self._write_iodir()
+
+    def batch_output(self, pins):
+        """
+        Sets several output pins in one go. `pins` should be a dictionary (or
+        an iterable of pairs) mapping pin numbers to values. The new port state
+        is composed locally and written to the chip in a single transaction,
+        followed by the same port direction rewrite as :meth:`output`.
+        """
+        with MCP23017.__lock:
+            self._write_output_pins(dict(pins))
+            self._write_iodir()
+
+    def _write_output_pins(self, pins):
+        """
+        Same as :meth:`_write_output`, but for a dictionary of pin values
+        written together.
         """
-        self._write_output(*args, **kwargs)
-        self._write_iodir()
+        self._retry(self._device.output_pins, pins)
 
     def _write_output(self, *args, **kwargs):
         """
         Sometimes sending commands over the bus too quickly causes
-        OSError I/O Exceptions. Add some delay/retry on outputs
+        OSError I/O Exceptions. Retry outputs when that happens.
         """
-        last_err = None
-        for iter in range(0, 3):
-            time.sleep(0.05)
-            try:
-                MCP23017.__instance.output(*args, **kwargs)
-            except OSError as error:
-                if error.errno == 121 and iter < 3:
-                    pass
-                else:
-                    raise
+        self._retry(self._device.output, *args, **kwargs)
 
     def _write_iodir(self):
         """
         Sometimes sending commands over the bus too quickly causes
-        OSError I/O Exceptions. Add some delay/retry
+        OSError I/O Exceptions. Retry when that happens.
         """
-        last_err = None
-        for iter in range(0, 3):
-            time.sleep(0.05)
+        self._retry(self._device.write_iodir)
+
+    @staticmethod
+    def _retry(method, *args, **kwargs):
+        """
+        Calls method up to three times, backing off exponentially (10ms, 20ms)
+        only after a remote I/O error (errno 121). Any other error, or a
+        third failure, is raised.
+        """
+        for attempt in range(0, 3):
             try:
-                MCP23017.__instance.write_iodir()
+                return method(*args, **kwargs)
             except OSError as error:
-                if error.errno == 121 and iter < 3:
-                    pass
-                else:
+                if error.errno != 121 or attempt == 2:
                     raise
-
-    def __getattr__(self, name):
-        with MCP23017.__lock:
-            subattr = getattr(MCP23017.__instance, name)
-            if callable(subattr):
-                def fn(*args, **kwargs):
-                    with MCP23017.__lock:
-                        return subattr(*args, **kwargs)
-                return fn
-            return subattr
+            time.sleep(0.01 * (2 ** attempt))
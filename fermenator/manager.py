@@ -2,12 +2,144 @@
 This package includes the :class:`ManagerThread` object that manages each beer.
 """
 import logging
+import queue
 import threading
 import time
 
+from .beer import HEATING_STATE, COOLING_STATE, PASSIVE_STATE
 from .exception import (
     ConfigurationError, FermenatorError, DataSourceError)
 
+class StateWriter():
+    """
+    Writes state information to datasources from a single background thread,
+    so that managers never wait on datasource I/O during a poll. Writes queued
+    for the same datasource and key before the thread gets to them are
+    coalesced, and only the most recent value is written. Everything pending
+    for a datasource is written with one call to its `set_many` method.
+
+    If a datasource stops responding, at most :attr:`MAX_QUEUED` writes are
+    held, and the oldest are dropped to make room for new ones.
+    """
+
+    #: Maximum number of writes waiting for the writer thread
+    MAX_QUEUED = 1000
+
+    #: Seconds :meth:`flush` waits for queued writes by default
+    FLUSH_TIMEOUT = 10.0
+
+    def __init__(self):
+        self.log = logging.getLogger(
+            "{}.{}".format(
+                self.__class__.__module__,
+                self.__class__.__name__))
+        self._queue = queue.Queue(self.MAX_QUEUED)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._dropped = 0
+
+    def put(self, datasource, key, value):
+        """
+        Queue `value` to be set at `key` in `datasource`. Starts the writer
+        thread if it isn't already running. Never blocks: if the queue is
+        full, the oldest queued write is dropped.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="fermenator-state-writer",
+                    daemon=True)
+                self._thread.start()
+            while True:
+                try:
+                    self._queue.put_nowait((datasource, key, value))
+                    break
+                except queue.Full:
+                    pass
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self._queue.task_done()
+                if not self._dropped:
+                    self.log.warning(
+                        "state writes are backing up, dropping the oldest")
+                self._dropped += 1
+            if self._dropped and self._queue.qsize() < self.MAX_QUEUED // 2:
+                self.log.warning(
+                    "state writes caught up, %d dropped", self._dropped)
+                self._dropped = 0
+
+    def flush(self, timeout=None):
+        """
+        Blocks until everything queued so far has been written (or has failed),
+        but for no longer than `timeout` seconds [default:
+        :attr:`FLUSH_TIMEOUT`], so that a hung datasource can't hold up a
+        caller that is shutting down. Returns True if the queue drained, False
+        if writes were still pending when the time ran out.
+        """
+        if timeout is None:
+            timeout = self.FLUSH_TIMEOUT
+        deadline = time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.log.warning(
+                        "gave up waiting for %d pending state writes",
+                        self._queue.unfinished_tasks)
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def _run(self):
+        """
+        Drains the queue in batches, writing the latest value for each
+        datasource and key.
+        """
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            pending = dict()
+            for datasource, key, value in batch:
+                pending.setdefault(datasource, dict())[key] = value
+            try:
+                for datasource, values in pending.items():
+                    try:
+                        datasource.set_many(values.items())
+                    except DataSourceError as err:
+                        self.log.error(
+                            "Error writing state information to datastore: %s",
+                            err)
+                    except Exception as err:
+                        self.log.critical(
+                            "Unhandled exception writing state to %s: %s",
+                            datasource, err)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+#: The :class:`StateWriter` shared by all managers
+STATE_WRITER = StateWriter()
+
+def efficacy_error(efficacy, target, tolerance):
+    """
+    Compares a measured `efficacy` (temperature change per poll) with the
+    `target` efficacy. Returns -1 if it falls short of the target by more than
+    `tolerance`, 1 if it exceeds the target by more than `tolerance`, or 0 if
+    it is within the tolerance band.
+    """
+    difference = efficacy - target
+    if difference < -tolerance:
+        return -1
+    if difference > tolerance:
+        return 1
+    return 0
+
 class ManagerThread():
     """
     Create one of these for every beer that needs to be managed.
@@ -17,6 +149,32 @@ class ManagerThread():
     as desired.
     """
 
+    __slots__ = (
+        'name', 'beer', 'log', '_active_cooling', '_active_heating',
+        '_active_cooling_relay', '_active_heating_relay', '_modulate_heating',
+        '_modulate_cooling', '_polling_frequency', '_target_efficacy',
+        '_neg_target_efficacy', '_efficacy_tolerance', 'write_datasources',
+        'state_path_prefix', '_heartbeat_path', '_stale_data_path',
+        '_heating_path', '_cooling_path', 'stale_data',
+        '_npolls_wait_duty_change', '_heat_duty_cycle_increment',
+        '_cool_duty_cycle_increment', '_current_poll', '_stop_event',
+        '_thread', '_heat_duty_cycle', '_cool_duty_cycle',
+        '_last_duty_change_poll', '_last_temp_at_duty_change',
+        '_last_logged_state', '_last_logged_poll', '_heartbeat_every',
+        '_wake_event', '_dispatch')
+
+    #: Heating, cooling and stale data state are only written when they change,
+    #: but are rewritten in full after this many polls regardless, in case an
+    #: earlier write was lost
+    STATE_REFRESH_POLLS = 60
+
+    #: Configuration keys understood by :meth:`__init__`
+    CONFIG_KEYS = frozenset((
+        'beer', 'active_cooling', 'active_heating', 'active_cooling_relay',
+        'active_heating_relay', 'modulate_heating', 'modulate_cooling',
+        'polling_frequency', 'target_efficacy', 'efficacy_tolerance',
+        'write_datasources', 'state_path_prefix', 'heartbeat_every'))
+
     def __init__(self, name, **kwargs):
         """
         Pass a name plus one or more of the following arguments:
@@ -31,6 +189,13 @@ class ManagerThread():
           state information to
         - state_path_prefix: a prefix where to write state information in
           write_datasources [default: fermenator.state]
+        - heartbeat_every: write the heartbeat to write_datasources every
+          this many polls [default: 1]
+        - target_efficacy: the temperature change per poll that modulated
+          heating or cooling aims for [default: 1/60]
+        - efficacy_tolerance: how far the measured efficacy may stray from
+          target_efficacy before the duty cycle is adjusted
+          [default: 10% of target_efficacy]
 
         """
         self.name = name
@@ -43,42 +208,68 @@ class ManagerThread():
                 self.__class__.__name__,
                 self.name,
                 self.beer.name))
-        self._active_cooling = kwargs.pop('active_cooling', False)
-        self._active_heating = kwargs.pop('active_heating', False)
-        self._active_cooling_relay = kwargs.pop('active_cooling_relay', None)
-        self._active_heating_relay = kwargs.pop('active_heating_relay', None)
-        self._modulate_heating = kwargs.pop('modulate_heating', False)
-        self._modulate_cooling = kwargs.pop('modulate_cooling', False)
-        self._polling_frequency = float(kwargs.pop('polling_frequency', 60))
+        self._active_cooling = kwargs.get('active_cooling', False)
+        self._active_heating = kwargs.get('active_heating', False)
+        self._active_cooling_relay = kwargs.get('active_cooling_relay', None)
+        self._active_heating_relay = kwargs.get('active_heating_relay', None)
+        self._modulate_heating = kwargs.get('modulate_heating', False)
+        self._modulate_cooling = kwargs.get('modulate_cooling', False)
+        self._polling_frequency = float(kwargs.get('polling_frequency', 60))
+        if self._polling_frequency <= 0:
+            raise ConfigurationError(
+                "polling_frequency must be greater than zero")
         self._target_efficacy = float(
-            kwargs.pop('target_efficacy', 1 / 60.0))
-        try:
-            self.write_datasources = kwargs['write_datasources']
-        except KeyError:
+            kwargs.get('target_efficacy', 1 / 60.0))
+        self._neg_target_efficacy = -self._target_efficacy
+        self._efficacy_tolerance = abs(float(kwargs.get(
+            'efficacy_tolerance', self._target_efficacy * 0.1)))
+        self.write_datasources = kwargs.get('write_datasources')
+        if not self.write_datasources:
             self.log.warning("no write datasources defined, state logging disabled")
             self.write_datasources = dict()
+        unknown = set(kwargs) - self.CONFIG_KEYS
+        if unknown:
+            self.log.warning(
+                "ignoring unknown configuration keys: %s",
+                ", ".join(sorted(unknown)))
+        self._heartbeat_every = max(1, int(kwargs.get('heartbeat_every', 1)))
         self.state_path_prefix = tuple(
-            kwargs.pop('state_path_prefix', "fermenator.state").split('.'))
+            kwargs.get('state_path_prefix', "fermenator.state").split('.'))
+        self._heartbeat_path = self.state_path_prefix + (self.name, "heartbeat")
+        self._stale_data_path = self.state_path_prefix + (
+            self.beer.name, "stale-data")
+        self._heating_path = self.state_path_prefix + (self.beer.name, "heating")
+        self._cooling_path = self.state_path_prefix + (self.beer.name, "cooling")
         self.stale_data = False
         self._npolls_wait_duty_change = 5
         self._heat_duty_cycle_increment = 0.05
         self._cool_duty_cycle_increment = 0.01
         self._current_poll = 0
-        self._stop = False
-        self._thread = threading.Thread(target=self.run)
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self.run, name="fermenator-{}".format(self.name))
         self._heat_duty_cycle = None
         self._cool_duty_cycle = None
         self._last_duty_change_poll = self._current_poll
         self._last_temp_at_duty_change = 0
-
-    def __del__(self):
-        """
-        Called automatically during garbage collection. When called, sets
-        self._stop to True, to try to ensure that any thread action is
-        discontinued.
-        """
-        self.log.debug("destructing")
-        self._stop = True
+        self._last_logged_state = None
+        self._last_logged_poll = 0
+        self._dispatch = {
+            HEATING_STATE: self._heat,
+            COOLING_STATE: self._cool,
+            PASSIVE_STATE: self._rest,
+        }
+
+    def __enter__(self):
+        "Starts the manager when used as a context manager"
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        "Stops the manager and waits for its thread to finish"
+        self.stop()
+        self.join()
 
     def start(self):
         """
@@ -105,9 +296,18 @@ class ManagerThread():
 
     @polling_frequency.setter
     def polling_frequency(self, value):
-        "Sets the value of polling frequency"
+        """
+        Sets the value of polling frequency. A running manager reschedules
+        its next poll right away. Raises :class:`ConfigurationError`, leaving
+        the current value in place, unless `value` is greater than zero.
+        """
+        value = float(value)
+        if value <= 0:
+            raise ConfigurationError(
+                "polling_frequency must be greater than zero")
         self.log.info("polling frequency set to %s", value)
         self._polling_frequency = value
+        self._wake_event.set()
 
     @property
     def active_cooling_relay(self):
@@ -171,84 +371,115 @@ class ManagerThread():
         """
         Checks on the state of the monitored beer, and enables or disables
         heating accordingly. Runs in an infinite loop that can only be
-        interrupted by self._stop being set True (which is checked once per
-        quarter second). Ensurses that relays are disabled on shutdown.
+        interrupted by :meth:`stop`, which wakes the thread immediately.
+        Ensurses that relays are disabled on shutdown.
+
+        Polls are scheduled on a fixed grid of `polling_frequency` intervals
+        from the first poll. If a poll overruns its interval, the polls it ran
+        into are skipped rather than run back-to-back. Changing the polling
+        frequency moves the next poll to the new interval after the last one.
+
+        Relays are switched off and final state is logged however the loop
+        ends, including on an unexpected error outside of a poll.
         """
-        while not self._stop:
-            t_start = time.time()
-            self._current_poll += 1
-            self.log.debug("started poll %d", self._current_poll)
-            try:
-                if self.beer.requires_heating(self.is_heating(), self.is_cooling()):
-                    self._stop_cooling()
-                    self._start_heating()
-                elif self.beer.requires_cooling(self.is_heating(), self.is_cooling()):
-                    self._stop_heating()
-                    self._start_cooling()
-                else:
-                    self.log.info("at set point")
+        log = self.log
+        next_poll = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                poll_time = next_poll
+                self._current_poll += 1
+                log.debug("started poll %d", self._current_poll)
+                try:
+                    self._poll(self.is_heating(), self.is_cooling())
+                    self.stale_data = False
+                except FermenatorError as err:
+                    log.error("TEMPERATURE MANAGEMENT DISABLED: %s", err)
+                    self.stale_data = True
                     self._stop_heating()
                     self._stop_cooling()
-                self.stale_data = False
-            except FermenatorError as err:
-                self.log.error(
-                    "TEMPERATURE MANAGEMENT DISABLED: %s",
-                    str(err), exc_info=0)
-                self.stale_data = True
-                self._stop_heating()
-                self._stop_cooling()
-            except Exception as err:
-                self.log.critical("Unhandled exception:", str(err), exc_info=0)
-                pass
-            self._log_state()
-            while not self._stop and ((time.time() - t_start) < self.polling_frequency):
-                time.sleep(0.25)
+                except Exception as err:
+                    log.critical("Unhandled exception: %s", err)
+                self._log_state(self.is_heating(), self.is_cooling())
+                polling_frequency = self.polling_frequency
+                next_poll = poll_time + polling_frequency
+                now = time.monotonic()
+                if next_poll <= now and polling_frequency > 0:
+                    skipped = (now - next_poll) // polling_frequency + 1
+                    log.warning(
+                        "poll %d overran the polling frequency, skipping %d polls",
+                        self._current_poll, skipped)
+                    next_poll += skipped * polling_frequency
+                while self._wake_event.wait(next_poll - time.monotonic()):
+                    self._wake_event.clear()
+                    if self._stop_event.is_set():
+                        break
+                    next_poll = max(
+                        poll_time + self.polling_frequency, time.monotonic())
+        except Exception as err:
+            log.critical("manager loop failed, shutting down: %s", err)
+        finally:
+            # always leave the relays off, even if the loop itself failed
+            self._stop_heating()
+            self._stop_cooling()
+            self._log_state(self.is_heating(), self.is_cooling())
+            STATE_WRITER.flush()
+        self.log.debug("finished")
+
+    def _poll(self, heating, cooling):
+        """
+        Asks the beer what it needs, given the current `heating` and `cooling`
+        states, and starts or stops heating and cooling accordingly.
+        """
+        recommendation = self.beer.get_recommendation(heating, cooling)
+        self._dispatch.get(recommendation, self._rest)()
+
+    def _heat(self):
+        "Stops cooling and starts heating"
+        self._stop_cooling()
+        self._start_heating()
+
+    def _cool(self):
+        "Stops heating and starts cooling"
+        self._stop_heating()
+        self._start_cooling()
+
+    def _rest(self):
+        "Stops both heating and cooling"
+        self.log.info("at set point")
         self._stop_heating()
         self._stop_cooling()
-        self._log_state()
-        self.log.debug("finished")
 
     def stop(self):
         """
-        Call this method to set self._stop True and terminate thread activity.
+        Call this method to terminate thread activity. A thread waiting for
+        its next poll is woken up immediately.
         """
-        self._stop = True
+        self._stop_event.set()
+        self._wake_event.set()
         self.log.info("stopping")
 
     def is_heating(self):
         "Returns True if the managed beer is currently being heated"
-        try:
-            return self.active_heating_relay.is_running()
-        except AttributeError:
+        relay = self._active_heating_relay
+        if relay is None:
             return False
+        return relay.is_running()
 
     def is_cooling(self):
         "Returns True if the managed beer is currently being cooled"
-        try:
-            return self.active_cooling_relay.is_running()
-        except AttributeError:
+        relay = self._active_cooling_relay
+        if relay is None:
             return False
+        return relay.is_running()
 
-    def _is_collecting_temp_info(self):
-        "Returns true if we haven't completed enough polls for reliable info"
-        if (self._current_poll - self._last_duty_change_poll) \
-            > self._npolls_wait_duty_change:
-            return False
-        return True
-
-    def _temp_change_per_poll(self):
+    def _mark_duty_change(self, avg_temp):
         """
-        Returns the change in beer temp per poll, scoped since the last time
-        cooling or heating cycles were updated
+        Records the poll and average temperature at which heating or cooling
+        started or had its duty cycle changed, which is the baseline for
+        measuring efficacy.
         """
-        try:
-            return (self.beer.avg_temp() - self._last_temp_at_duty_change) / \
-                (self._current_poll - self._last_duty_change_poll)
-        except ZeroDivisionError:
-            self.log.error(
-                "division by zero when calculating temp change per poll. "
-                "curr_poll: %d, last_duty_change_poll: %d",
-                self._current_poll, self._last_duty_change_poll)
+        self._last_temp_at_duty_change = avg_temp
+        self._last_duty_change_poll = self._current_poll
 
     def _start_heating(self):
         """
@@ -256,49 +487,51 @@ class ManagerThread():
         handles the logic of determining if a relay is present and if config
         allows for active heating.
         """
-        if not self.active_heating:
+        if not self._active_heating:
             return
-        if not self.active_heating_relay:
+        relay = self._active_heating_relay
+        if not relay:
             self.log.warning(
                 "heating required but no active heating relay set")
             return
-        if not self.active_heating_relay.is_running():
-            self.active_heating_relay.on()
-            self._heat_duty_cycle = self.active_heating_relay.duty_cycle
-            self._last_temp_at_duty_change = self.beer.avg_temp()
-            self._last_duty_change_poll = self._current_poll
+        if not relay.is_running():
+            relay.on()
+            self._heat_duty_cycle = relay.duty_cycle
+            self._mark_duty_change(self.beer.avg_temp())
             self.log.debug(
                 "starting heating cycle at poll %d", self._current_poll)
         elif self._modulate_heating and self._heat_duty_cycle:
-            if self._is_collecting_temp_info():
+            polls = self._current_poll - self._last_duty_change_poll
+            if polls <= self._npolls_wait_duty_change:
                 return
-            efficacy_now = self._temp_change_per_poll()
+            avg_temp = self.beer.avg_temp()
+            efficacy_now = (avg_temp - self._last_temp_at_duty_change) / polls
             self.log.info(
                 "current heating efficacy: %0.2f per poll", efficacy_now)
-            if efficacy_now < self._target_efficacy:
-                self._increase_heating_efficacy()
-            elif efficacy_now > self._target_efficacy:
-                self._decrease_heating_efficacy()
+            error = efficacy_error(
+                efficacy_now, self._target_efficacy, self._efficacy_tolerance)
+            if error < 0:
+                self._increase_heating_efficacy(avg_temp)
+            elif error > 0:
+                self._decrease_heating_efficacy(avg_temp)
             else:
                 self.log.info(
                     "target heating efficacy duty cycle (%0.2f) reached",
                     self._heat_duty_cycle
                     )
 
-    def _decrease_heating_efficacy(self):
+    def _decrease_heating_efficacy(self, avg_temp):
         "Decreases the duty cycle of heating"
-        self._last_temp_at_duty_change = self.beer.avg_temp()
-        self._last_duty_change_poll = self._current_poll
+        self._mark_duty_change(avg_temp)
         self._heat_duty_cycle -= self._heat_duty_cycle_increment
         self._active_heating_relay.alter_duty_cycle(self._heat_duty_cycle)
         self.log.debug(
             "heating duty cycle decreased to %0.2f",
             self._heat_duty_cycle)
 
-    def _increase_heating_efficacy(self):
+    def _increase_heating_efficacy(self, avg_temp):
         "Increases the duty cycle of heating"
-        self._last_temp_at_duty_change = self.beer.avg_temp()
-        self._last_duty_change_poll = self._current_poll
+        self._mark_duty_change(avg_temp)
         if self._heat_duty_cycle >= 100:
             self.log.warning(
                 "heating is insufficient for current ambient")
@@ -314,10 +547,9 @@ class ManagerThread():
         Call this method whenever cooling is started or when heat is no longer
         required.
         """
-        try:
-            self.active_heating_relay.off()
-        except AttributeError as err:
-            pass
+        relay = self._active_heating_relay
+        if relay is not None:
+            relay.off()
 
     def _start_cooling(self):
         """
@@ -325,47 +557,50 @@ class ManagerThread():
         handles the logic of determining if a relay is present and if config
         allows for active cooling.
         """
-        if not self.active_cooling:
+        if not self._active_cooling:
             return
-        if not self.active_cooling_relay:
+        relay = self._active_cooling_relay
+        if not relay:
             self.log.warning(
                 "cooling required but no active cooling relay set")
             return
-        if not self.active_cooling_relay.is_running():
-            self.active_cooling_relay.on()
-            self._cool_duty_cycle = self.active_cooling_relay.duty_cycle
-            self._last_temp_at_duty_change = self.beer.avg_temp()
-            self._last_duty_change_poll = self._current_poll
+        if not relay.is_running():
+            relay.on()
+            self._cool_duty_cycle = relay.duty_cycle
+            self._mark_duty_change(self.beer.avg_temp())
         elif self._modulate_cooling and self._cool_duty_cycle:
-            if self._is_collecting_temp_info():
+            polls = self._current_poll - self._last_duty_change_poll
+            if polls <= self._npolls_wait_duty_change:
                 return
-            efficacy_now = self._temp_change_per_poll()
+            avg_temp = self.beer.avg_temp()
+            efficacy_now = (avg_temp - self._last_temp_at_duty_change) / polls
             self.log.debug(
                 "current cooling efficacy: %0.2f per poll", efficacy_now)
-            if efficacy_now < -1 * self._target_efficacy:
-                self._decrease_cooling_efficacy()
-            elif efficacy_now > -1 * self._target_efficacy:
-                self._increase_cooling_efficacy()
+            error = efficacy_error(
+                efficacy_now, self._neg_target_efficacy,
+                self._efficacy_tolerance)
+            if error < 0:
+                self._decrease_cooling_efficacy(avg_temp)
+            elif error > 0:
+                self._increase_cooling_efficacy(avg_temp)
             else:
                 self.log.debug(
                     "target cooling efficacy duty cycle (%0.2f) reached",
                     self._cool_duty_cycle
                     )
 
-    def _decrease_cooling_efficacy(self):
+    def _decrease_cooling_efficacy(self, avg_temp):
         "Decreases the duty cycle of cooling"
-        self._last_temp_at_duty_change = self.beer.avg_temp()
-        self._last_duty_change_poll = self._current_poll
+        self._mark_duty_change(avg_temp)
         self._cool_duty_cycle -= self._cool_duty_cycle_increment
         self._active_cooling_relay.alter_duty_cycle(self._cool_duty_cycle)
         self.log.debug(
             "cooling duty cycle decreased to %0.2f",
             self._cool_duty_cycle)
 
-    def _increase_cooling_efficacy(self):
+    def _increase_cooling_efficacy(self, avg_temp):
         "Increases the duty cycle of cooling"
-        self._last_temp_at_duty_change = self.beer.avg_temp()
-        self._last_duty_change_poll = self._current_poll
+        self._mark_duty_change(avg_temp)
         if self._cool_duty_cycle and self._cool_duty_cycle >= 100:
             self.log.warning(
                 "cooling is insufficient for current ambient")
@@ -381,35 +616,42 @@ class ManagerThread():
         Call this method whenever cooling is started or when cool is no longer
         required.
         """
-        try:
-            self.active_cooling_relay.off()
-        except AttributeError:
-            pass
+        relay = self._active_cooling_relay
+        if relay is not None:
+            relay.off()
 
-    def _log_state(self):
-        try:
-            now = time.time()
-            for logger in self.write_datasources:
-                logger.set(
-                    self.state_path_prefix + (self.name, "heartbeat"), now)
-                if self.stale_data:
-                    logger.set(
-                        self.state_path_prefix + (self.beer.name, "stale-data"), 1)
-                else:
-                    logger.set(
-                        self.state_path_prefix + (self.beer.name, "stale-data"), 0)
-                if self.is_heating():
-                    logger.set(
-                        self.state_path_prefix + (self.beer.name, "heating"), 1)
-                else:
-                    logger.set(
-                        self.state_path_prefix + (self.beer.name, "heating"), 0)
-                if self.is_cooling():
-                    logger.set(
-                        self.state_path_prefix + (self.beer.name, "cooling"), 1)
-                else:
-                    logger.set(
-                        self.state_path_prefix + (self.beer.name, "cooling"), 0)
-        except DataSourceError as err:
-            self.log.error(
-                "Error writing state information to datastore: %s", err)
+    def _log_state(self, heating, cooling):
+        """
+        Queues state information for each of the write datasources with the
+        :data:`STATE_WRITER`. `heating` and `cooling` are the current relay
+        states, read once by the caller rather than once per datasource.
+
+        The heartbeat is written every `heartbeat_every` polls. Stale data,
+        heating and cooling state are only written when one of them has changed
+        since the last write, or every :attr:`STATE_REFRESH_POLLS` polls, and
+        are always accompanied by a heartbeat. Time series datasources (see
+        :attr:`fermenator.datasource.DataSource.TIME_SERIES`) get the state on
+        every poll, so that their series have no gaps.
+        """
+        if not self.write_datasources:
+            return
+        now = time.time()
+        state = (
+            1 if self.stale_data else 0,
+            1 if heating else 0,
+            1 if cooling else 0)
+        changed = state != self._last_logged_state or \
+            self._current_poll - self._last_logged_poll >= \
+            self.STATE_REFRESH_POLLS
+        if changed:
+            self._last_logged_state = state
+            self._last_logged_poll = self._current_poll
+        heartbeat = changed or self._current_poll % self._heartbeat_every == 0
+        stale_data, heating, cooling = state
+        for logger in self.write_datasources:
+            if heartbeat:
+                STATE_WRITER.put(logger, self._heartbeat_path, now)
+            if changed or logger.TIME_SERIES:
+                STATE_WRITER.put(logger, self._stale_data_path, stale_data)
+                STATE_WRITER.put(logger, self._heating_path, heating)
+                STATE_WRITER.put(logger, self._cooling_path, cooling)
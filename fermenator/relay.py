@@ -20,6 +20,17 @@ class Relay(object):
     relay. Extend this class to control specific hardware architectures.
     """
 
+    __slots__ = (
+        'log', '_config', 'name', '_state', '_cycle_time', '_duty_cycle',
+        '_on_time', '_off_time', 'minimum_off_time', 'high_signal',
+        '_duty_cycle_thread', '_last_off_time', '_unchanged_writes')
+
+    #: Switching a relay to the state it is already in normally leaves the
+    #: hardware alone, but every this many such calls the output is written
+    #: anyway, in case the device lost its state (eg. an I/O expander that
+    #: was reset)
+    REWRITE_EVERY = 10
+
     def __init__(self, name, **kwargs):
         """
         The following kwargs are supported:
@@ -54,25 +65,17 @@ class Relay(object):
         self._config = kwargs
         self.name = name
         self._state = None
-        try:
-            self._duty_cycle = float(kwargs['duty_cycle'])
+        self._unchanged_writes = 0
+        if 'duty_cycle' in kwargs and 'cycle_time' in kwargs:
             self._cycle_time = float(kwargs['cycle_time'])
-        except KeyError:
+            self._set_duty_cycle(float(kwargs['duty_cycle']))
+        else:
             self.log.debug("No duty cycle configured")
-            self._duty_cycle = None
-        try:
-            self.minimum_off_time = float(kwargs['minimum_off_time'])
-        except KeyError:
-            self.minimum_off_time = 0.0
-        try:
-            self.high_signal = kwargs['active_high']
-        except KeyError:
-            self.high_signal = True
+            self._set_duty_cycle(None)
+        self.minimum_off_time = float(kwargs.get('minimum_off_time', 0.0))
+        self.high_signal = kwargs.get('active_high', True)
         self._duty_cycle_thread = None
-        self._last_off_time = time.time()
-        self.off()
-
-    def __del__(self):
+        self._last_off_time = time.monotonic()
         self.off()
 
     def on(self):
@@ -94,10 +97,16 @@ class Relay(object):
     def _on_hook(self):
         """
         This hook is called whenever the relay is switched on, and actually
-        performs the low-level function of switching on the device
+        performs the low-level function of switching on the device. Returns
+        True if the device should be written to: when the relay was switched
+        on, and every :attr:`REWRITE_EVERY` calls while it was already on.
         """
+        if self._state == ON:
+            return self._rewrite_due()
+        self._unchanged_writes = 0
         self.log.debug("switching on")
         self._state = ON
+        return True
 
     def off(self):
         "Turns off the relay"
@@ -109,15 +118,47 @@ class Relay(object):
     def _off_hook(self):
         """
         This hook is called whenever the relay is switched off, and actually
-        performs the low-level function of switching the relay off
+        performs the low-level function of switching the relay off. Returns
+        True if the device should be written to: when the relay was switched
+        off, and every :attr:`REWRITE_EVERY` calls while it was already off.
+        """
+        if self._state == OFF:
+            return self._rewrite_due()
+        self._unchanged_writes = 0
+        # Only change _last_off_time when actually turning off a relay.
+        # You can call off() while a relay is in off-state part of duty cycle
+        # and don't have to wait a full minimum_off_time before turning on.
+        self._last_off_time = time.monotonic()
+        self.log.debug("switching off")
+        self._state = OFF
+        return True
+
+    def _rewrite_due(self):
         """
-        if self._state != OFF:
-            # Only change _last_off_time when actually turning off a relay.
-            # You can call off() while a relay is in off-state part of duty cycle
-            # and don't have to wait a full minimum_off_time before turning on.
-            self._last_off_time = time.time()
-            self.log.debug("switching off")
-            self._state = OFF
+        Counts a call that didn't change the relay state, returning True if
+        the output should be written again regardless.
+        """
+        self._unchanged_writes += 1
+        if self._unchanged_writes < self.REWRITE_EVERY:
+            return False
+        self._unchanged_writes = 0
+        self.log.debug("rewriting unchanged relay state")
+        return True
+
+    def close(self):
+        """
+        Turns off the relay and releases anything it holds on to. Call this
+        when the relay is no longer needed.
+        """
+        self.off()
+
+    def __enter__(self):
+        "Returns the relay, for use as a context manager"
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        "Closes the relay"
+        self.close()
 
     def is_running(self):
         """
@@ -138,17 +179,13 @@ class Relay(object):
         """
         Returns True if the relay state is on, False otherwise.
         """
-        if self._state == ON:
-            return True
-        return False
+        return self._state == ON
 
     def is_off(self):
         """
-        Returns True if the relay state is on, False otherwise.
+        Returns True if the relay state is off, False otherwise.
         """
-        if self._state == OFF:
-            return True
-        return False
+        return self._state == OFF
 
     @property
     def duty_cycle(self):
@@ -164,24 +201,37 @@ class Relay(object):
         of on time not the cycle duration, which is a much more static property.
         """
         if duty_cycle_pct > 1.0:
-            self._duty_cycle = None
+            self._set_duty_cycle(None)
         elif duty_cycle_pct < 0.0:
-            self._duty_cycle = 0.0
+            self._set_duty_cycle(0.0)
         else:
-            self._duty_cycle = duty_cycle_pct
+            self._set_duty_cycle(duty_cycle_pct)
         relay_was_running = self.is_running()
         self.off()
         if relay_was_running:
             self.on()
 
+    def _set_duty_cycle(self, duty_cycle):
+        """
+        Sets the duty cycle along with the on and off time of each cycle that
+        results from it. A duty cycle of None or zero leaves the relay on for
+        as long as it is running.
+        """
+        self._duty_cycle = duty_cycle
+        if duty_cycle:
+            self._on_time = duty_cycle * self._cycle_time
+            self._off_time = self._cycle_time - self._on_time
+        else:
+            self._on_time = None
+            self._off_time = None
+
     def _stop_duty_cycle(self):
         """
         Stops any running duty cycle threads
         """
-        try:
-            self._duty_cycle_thread.stop()
-        except AttributeError:
-            pass
+        thread = self._duty_cycle_thread
+        if thread is not None:
+            thread.stop()
         self._duty_cycle_thread = None
 
     def _run_duty_cycle(self):
@@ -190,28 +240,46 @@ class Relay(object):
         the specified duty cycle config. Meant to be passed to a Thread
         object and run in the background.
         """
-        remaining_time = self._last_off_time + self.minimum_off_time - time.time()
+        wait = self._duty_cycle_thread.stopping.wait
+        monotonic = time.monotonic
+        remaining_time = self._last_off_time + self.minimum_off_time - monotonic()
         if remaining_time > 0:
             self.log.debug(
                 "waiting %ds for minimum_off_time to expire before turning on",
                 remaining_time)
-            if self._duty_cycle_thread.stopping.wait(timeout=remaining_time):
+            if wait(timeout=remaining_time):
                 return
         elif self._duty_cycle:
             self.log.debug(
                 "duty cycle thread starting at %0.2f", self._duty_cycle)
-        on_time = None
-        off_time = None
-        if self._duty_cycle:
-            on_time = self._duty_cycle * self._cycle_time
-            off_time = self._cycle_time - on_time
+        on_time = self._on_time
+        off_time = self._off_time
+        if on_time is None:
+            while True:
+                try:
+                    self._on_hook()
+                    wait()
+                    break
+                except Exception as err:
+                    self.log.error("Relay loop caught exception: %s", err)
+            return
+        # each phase ends at a deadline counted from the start of the cycle
+        # rather than from when the wait began, so the time spent switching
+        # the relay doesn't stretch every cycle
+        deadline = monotonic()
         while True:
             try:
+                now = monotonic()
+                if now - deadline > self._cycle_time:
+                    self.log.warning("duty cycle fell behind, restarting it")
+                    deadline = now
                 self._on_hook()
-                if self._duty_cycle_thread.stopping.wait(timeout=on_time):
+                deadline += on_time
+                if wait(timeout=deadline - monotonic()):
                     break
                 self._off_hook()
-                if self._duty_cycle_thread.stopping.wait(timeout=off_time):
+                deadline += off_time
+                if wait(timeout=deadline - monotonic()):
                     break
             except Exception as err:
                 self.log.error("Relay loop caught exception: %s", err)
@@ -225,6 +293,8 @@ class GPIORelay(Relay):
     (where the user wants to slow down the temperature change).
     """
 
+    __slots__ = ('_output_device',)
+
     def __init__(self, name, **kwargs):
         """
         Same as :class:`Relay`, but also requires kwarg `gpio_pin`, which
@@ -256,16 +326,40 @@ class GPIORelay(Relay):
 
     def _on_hook(self):
         "Actually sends the low-level `on` signal to the relay"
-        super(GPIORelay, self)._on_hook()
-        self._output_device.on()
+        changed = super(GPIORelay, self)._on_hook()
+        if changed:
+            self._output(True)
+        return changed
 
     def _off_hook(self):
         "Sends the low-level signal to turn off the relay"
-        super(GPIORelay, self)._off_hook()
+        changed = super(GPIORelay, self)._off_hook()
+        if changed:
+            try:
+                self._output(False)
+            except AttributeError:
+                pass
+        return changed
+
+    def _output(self, value):
+        """
+        Switches the output device on if `value` is true, or off otherwise. If
+        the write fails, the relay state is forgotten, so that the next switch
+        on or off is written to the device rather than skipped.
+        """
         try:
-            self._output_device.off()
-        except AttributeError:
-            pass
+            if value:
+                self._output_device.on()
+            else:
+                self._output_device.off()
+        except Exception:
+            self._state = None
+            raise
+
+    def close(self):
+        "Turns off the relay and releases its GPIO pin"
+        super(GPIORelay, self).close()
+        self._output_device.close()
 
 class MCP23017Relay(Relay):
     """
@@ -274,6 +368,8 @@ class MCP23017Relay(Relay):
     interface.
     """
 
+    __slots__ = ('mx_pin', 'i2c_addr', '_output_device')
+
     def __init__(self, name, **kwargs):
         """
         Provide the following kwargs:
@@ -287,16 +383,9 @@ class MCP23017Relay(Relay):
 
         """
         if "mx_pin" not in kwargs:
-            raise ConfigurationError(
-                "No gpio_pin specified in relay configuration")
-        try:
-            self.mx_pin = kwargs['mx_pin']
-        except KeyError:
             raise ConfigurationError("mx_pin must be provided")
-        try:
-            self.i2c_addr = kwargs['i2c_addr']
-        except KeyError:
-            self.i2c_addr = 0x20
+        self.mx_pin = kwargs['mx_pin']
+        self.i2c_addr = kwargs.get('i2c_addr', 0x20)
         self._output_device = fermenator.i2c.MCP23017(
             self.i2c_addr
         )
@@ -305,13 +394,29 @@ class MCP23017Relay(Relay):
 
     def _on_hook(self):
         "Actually sends the low-level `on` signal to the relay"
-        super(MCP23017Relay, self)._on_hook()
-        self._output_device.output(self.mx_pin, self.high_signal)
+        changed = super(MCP23017Relay, self)._on_hook()
+        if changed:
+            self._output(self.high_signal)
+        return changed
 
     def _off_hook(self):
         "Sends the low-level signal to turn off the relay"
-        super(MCP23017Relay, self)._off_hook()
+        changed = super(MCP23017Relay, self)._off_hook()
+        if changed:
+            try:
+                self._output(not self.high_signal)
+            except AttributeError:
+                pass
+        return changed
+
+    def _output(self, value):
+        """
+        Writes `value` to the relay pin. If the write fails, the relay state is
+        forgotten, so that the next switch on or off is written to the device
+        rather than skipped.
+        """
         try:
-            self._output_device.output(self.mx_pin, not self.high_signal)
-        except AttributeError:
-            pass
+            self._output_device.output(self.mx_pin, value)
+        except Exception:
+            self._state = None
+            raise
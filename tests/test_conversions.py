@@ -0,0 +1,25 @@
+import datetime
+import unittest
+from fermenator.conversions import convert_spreadsheet_date
+
+class TestConvertSpreadsheetDate(unittest.TestCase):
+
+    def test_morning(self):
+        self.assertEqual(
+            convert_spreadsheet_date(43000.25),
+            datetime.datetime(2017, 9, 22, 6, 0))
+
+    def test_afternoon_stays_on_same_day(self):
+        self.assertEqual(
+            convert_spreadsheet_date(43000.75),
+            datetime.datetime(2017, 9, 22, 18, 0))
+
+    def test_noon(self):
+        self.assertEqual(
+            convert_spreadsheet_date('43000.5'),
+            datetime.datetime(2017, 9, 22, 12, 0))
+
+    def test_formatted_date(self):
+        self.assertEqual(
+            convert_spreadsheet_date('9/22/2017 18:00:00'),
+            datetime.datetime(2017, 9, 22, 18, 0))
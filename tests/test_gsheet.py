@@ -0,0 +1,86 @@
+import unittest
+from fermenator.datasource.gsheet import GoogleSheet
+
+class FakeRequest(object):
+    def __init__(self, result):
+        self._result = result
+
+    def execute(self):
+        return self._result()
+
+class FakeDrive(object):
+    "Drive changes feed where the page token is an index into `changes`"
+
+    def __init__(self):
+        self.changes_made = []
+
+    def changes(self):
+        return self
+
+    def getStartPageToken(self):
+        return FakeRequest(
+            lambda: {'startPageToken': str(len(self.changes_made))})
+
+    def list(self, pageToken, spaces):
+        return FakeRequest(lambda: {
+            'changes': [
+                {'fileId': file_id}
+                for file_id in self.changes_made[int(pageToken):]],
+            'newStartPageToken': str(len(self.changes_made))})
+
+class FakeSheets(object):
+    "Sheets API that returns the number of fetches made so far"
+
+    def __init__(self):
+        self.fetches = 0
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, **kwargs):
+        def fetch():
+            self.fetches += 1
+            return {'values': [[self.fetches]]}
+        return FakeRequest(fetch)
+
+class TestSharedChangeTracking(unittest.TestCase):
+
+    def setUp(self):
+        self.drive = FakeDrive()
+        self.sheets = FakeSheets()
+
+    def make_sheet(self, name, ss_id):
+        sheet = GoogleSheet(
+            name, spreadsheet_id=ss_id, change_poll_interval=0)
+        sheet._drive_service_handle = self.drive
+        sheet._ss_service_handle = self.sheets
+        return sheet
+
+    def test_instances_share_fetches(self):
+        first = self.make_sheet('first', 'shared-fetch')
+        second = self.make_sheet('second', 'shared-fetch')
+        first.get_sheet_range('Sheet1!A1:E')
+        second.get_sheet_range('Sheet1!A1:E')
+        self.assertEqual(self.sheets.fetches, 1)
+        self.assertTrue(first.is_refreshed())
+        self.assertTrue(second.is_refreshed())
+
+    def test_change_seen_by_one_instance_refetches_for_another(self):
+        first = self.make_sheet('first', 'shared-change')
+        second = self.make_sheet('second', 'shared-change')
+        first.get_sheet_range_values('Sheet1!A1:E')
+        second.get_sheet_range_values('Sheet1!A1:E')
+        second.is_refreshed()
+        self.drive.changes_made.append('shared-change')
+        # the change is consumed outside of get_sheet_range, as
+        # GoogleSheetConfig.is_config_changed() does
+        self.assertTrue(first.is_spreadsheet_changed())
+        self.assertEqual(
+            second.get_sheet_range_values('Sheet1!A1:E'), [[2]])
+        self.assertTrue(second.is_refreshed())
+        self.assertEqual(
+            first.get_sheet_range_values('Sheet1!A1:E'), [[2]])
+        self.assertEqual(self.sheets.fetches, 2)